@@ -0,0 +1,25 @@
+"""
+Helpers shared by the dataset preparation scripts.
+"""
+import os
+
+# Number of threads used by the scripts to process files in parallel
+# (the work is file I/O, which releases the GIL)
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def atomic_write(path, chunks, mode='wb', buffering=-1):
+    """
+    Writes chunks (bytes, or str with mode='w') to path through a temp file that is
+    renamed over it, so the original is never left truncated.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, mode, buffering=buffering) as f:
+            f.writelines(chunks)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Don't leave a half-written temp file next to the untouched original
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,176 @@
+"""
+Compiled helpers for the per-line loops of brisanje_nepotrebnih_klasa.py and zamjena_klasa.py.
+
+The loops scan the raw bytes of an annotation file, parse the leading class id with a
+manual digit loop and copy (or rewrite) whole lines, compiled to machine code with Numba.
+Numba is optional (pip install numba): when it is not installed AVAILABLE is False and
+the scripts keep using their pure-Python loops.
+"""
+try:
+    import numpy as np
+    from numba import njit, types
+    AVAILABLE = True
+except ImportError:
+    AVAILABLE = False
+
+# Class ids with more significant digits than this can't be a class (keeps the value inside int64)
+MAX_ID_DIGITS = 18
+
+
+if AVAILABLE:
+    # The kernels are compiled eagerly for these argument types (at import, or loaded from
+    # the cache). Compiling lazily on the first call keeps that call's arguments alive in a
+    # reference cycle, and a live view of an mmap keeps it from being closed.
+    _BUFFER = types.Array(types.uint8, 1, 'C', readonly=True) # bytes / read-only mmap
+    _OUT = types.Array(types.uint8, 1, 'C')
+    _IDS = types.Array(types.int64, 1, 'C')
+
+    @njit(cache=True, nogil=True)
+    def _is_space(c):
+        # Space, \t, \n, \v, \f, \r (the bytes matched by \s)
+        return c == 32 or 9 <= c <= 13
+
+    @njit(cache=True, nogil=True)
+    def _line_end(data, start):
+        """Returns the index just past the end of the line starting at start (including '\\n')."""
+        n = data.shape[0]
+        i = start
+        while i < n and data[i] != 10:
+            i += 1
+        return i + 1 if i < n else n
+
+    @njit(cache=True, nogil=True)
+    def _parse_class_id(data, start, end):
+        """
+        Parses the leading class id of data[start:end].
+        Returns (class_id, digits_start, digits_end); class_id is -1 for a blank line,
+        -2 if the line doesn't start with a number followed by whitespace and -3 for a
+        number too large to be a class id. Leading zeros are allowed ("01" is class 1).
+        """
+        j = start
+        while j < end and _is_space(data[j]):
+            j += 1
+        if j == end:
+            return -1, j, j
+        k = j
+        value = 0
+        significant_digits = 0
+        while k < end and 48 <= data[k] <= 57:
+            if value > 0 or data[k] != 48:
+                significant_digits += 1
+            if significant_digits <= MAX_ID_DIGITS:
+                value = value * 10 + (data[k] - 48)
+            k += 1
+        if k == j or (k < end and not _is_space(data[k])):
+            return -2, j, k
+        if significant_digits > MAX_ID_DIGITS:
+            return -3, j, k
+        return value, j, k
+
+    @njit(cache=True, nogil=True)
+    def _contains(sorted_ids, value):
+        i = np.searchsorted(sorted_ids, value)
+        return i < sorted_ids.shape[0] and sorted_ids[i] == value
+
+    @njit(types.Tuple((_OUT, types.int64, types.int64, types.int64, types.int64))(_BUFFER, _IDS),
+          cache=True, nogil=True)
+    def _filter_kernel(data, keep_ids):
+        """
+        Copies the lines whose class id is in keep_ids (sorted) to a new array.
+        Returns (out, out_len, line_count, kept_count, bad_line_start); bad_line_start is
+        the offset of the first line without a valid class id, or -1.
+        """
+        n = data.shape[0]
+        out = np.empty(n, dtype=np.uint8)
+        out_len = 0
+        line_count = 0
+        kept_count = 0
+        start = 0
+        while start < n:
+            end = _line_end(data, start)
+            line_count += 1
+            class_id, _, _ = _parse_class_id(data, start, end)
+            if class_id == -2:
+                return out, 0, line_count, kept_count, start
+            if class_id >= 0 and _contains(keep_ids, class_id):
+                out[out_len:out_len + end - start] = data[start:end]
+                out_len += end - start
+                kept_count += 1
+            start = end
+        return out, out_len, line_count, kept_count, -1
+
+    @njit(cache=True, nogil=True)
+    def _write_int(out, pos, value):
+        """Writes value as decimal digits at out[pos:], returns the position after them."""
+        digits = 1
+        tmp = value // 10
+        while tmp > 0:
+            digits += 1
+            tmp //= 10
+        for d in range(digits - 1, -1, -1):
+            out[pos + d] = 48 + value % 10
+            value //= 10
+        return pos + digits
+
+    @njit(types.Tuple((_OUT, types.int64, types.int64))(_BUFFER, _IDS, _IDS, types.int64),
+          cache=True, nogil=True)
+    def _remap_kernel(data, old_ids, new_ids, capacity):
+        """
+        Replaces the leading class id of every line found in old_ids (sorted) with the
+        matching entry of new_ids; all other lines are copied unchanged.
+        Returns (out, out_len, remapped_count).
+        """
+        n = data.shape[0]
+        out = np.empty(capacity, dtype=np.uint8)
+        out_len = 0
+        remapped_count = 0
+        start = 0
+        while start < n:
+            end = _line_end(data, start)
+            class_id, d_start, d_end = _parse_class_id(data, start, end)
+            if class_id >= 0:
+                i = np.searchsorted(old_ids, class_id)
+                if i < old_ids.shape[0] and old_ids[i] == class_id:
+                    out[out_len:out_len + d_start - start] = data[start:d_start]
+                    out_len = _write_int(out, out_len + d_start - start, new_ids[i])
+                    out[out_len:out_len + end - d_end] = data[d_end:end]
+                    out_len += end - d_end
+                    remapped_count += 1
+                    start = end
+                    continue
+            out[out_len:out_len + end - start] = data[start:end]
+            out_len += end - start
+            start = end
+        return out, out_len, remapped_count
+
+
+def filter_lines(buf, keep_set):
+    """
+    Keeps only the lines of buf (bytes, or an mmap) whose class id is in keep_set.
+    Returns (filtered bytes, changed). Raises ValueError for a line without a valid class id.
+    """
+    data = np.frombuffer(buf, dtype=np.uint8)
+    keep_ids = np.array(sorted(c for c in keep_set if c >= 0), dtype=np.int64)
+    out, out_len, line_count, kept_count, bad_line_start = _filter_kernel(data, keep_ids)
+    if bad_line_start >= 0:
+        rest = data[bad_line_start:].tobytes()
+        line = rest[:rest.find(b"\n") + 1] or rest
+        # A view of an mmap left in the traceback would keep the mmap from being closed
+        del data
+        raise ValueError(f"invalid class id in line: {line!r}")
+    return out[:out_len].tobytes(), kept_count != line_count
+
+
+def remap_lines(buf, mapping):
+    """
+    Replaces the leading class id of the lines of buf using mapping ({old_id: new_id},
+    non-negative ints). Returns (remapped bytes, changed).
+    """
+    data = np.frombuffer(buf, dtype=np.uint8)
+    old_ids = np.array(sorted(mapping), dtype=np.int64)
+    new_ids = np.array([mapping[c] for c in sorted(mapping)], dtype=np.int64)
+    # Every line can grow by at most the digits of the longest new id
+    max_growth = max((len(str(c)) for c in mapping.values()), default=0)
+    capacity = len(data) + max_growth * (int(np.count_nonzero(data == 10)) + 1)
+    out, out_len, remapped_count = _remap_kernel(data, old_ids, new_ids, capacity)
+    return out[:out_len].tobytes(), remapped_count > 0
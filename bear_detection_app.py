@@ -1,28 +1,73 @@
 import sys
 import os
-import cv2
+import time
 import numpy as np
-from PIL import Image # Used for saving QImage to disk for temporary files
 
 # PyQt5 imports
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QFileDialog, QStackedWidget,
-    QScrollArea, QMessageBox, QSizePolicy, QProgressBar,
-    QSlider, QTabWidget
+    QMessageBox, QProgressBar,
+    QSlider, QTabWidget, QCheckBox
+)
+from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtCore import (
+    Qt, QThread, pyqtSignal, QUrl, QTimer,
+    QObject, QRunnable, QThreadPool
 )
-from PyQt5.QtGui import QPixmap, QImage, QPalette, QColor, QFont
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QUrl, QSize, QTimer
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
 from PyQt5.QtMultimediaWidgets import QVideoWidget
 
-# YOLO model import
-# Ensure 'ultralytics' is installed: pip install ultralytics
-from ultralytics import YOLO
+# Note: 'ultralytics' (pip install ultralytics) and 'cv2' are heavy imports, so they are
+# imported on first use instead of here; the window can be shown before they are loaded.
 
 # For creating temporary directories for YOLO output
 import tempfile
+import atexit # For removing the session temp directory on exit
+import queue
+import threading
 import shutil # For cleaning up temporary directories
+import importlib.util # For checking whether TensorRT is installed before exporting an engine
+
+# Fast content hashing for detecting duplicate input files
+# (xxhash is optional: pip install xxhash; hashlib is used otherwise)
+try:
+    import xxhash
+    new_file_hash = xxhash.xxh3_64
+except ImportError:
+    import hashlib
+    new_file_hash = hashlib.blake2b
+
+# Supported input file extensions (the worker treats everything that is not a video as an image)
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.gif'})
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv'})
+
+# Persistent cache of processed outputs, reused when the same file is detected again
+# with the same model and settings
+RESULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'bear_detection')
+# Maximum total size of the result cache; the least recently used entries are removed beyond it
+RESULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Number of video frames sent to the model in a single call
+# (must not exceed the batch size the TensorRT engine was exported with)
+VIDEO_BATCH_SIZE = 8
+# Maximum number of frames buffered between the decode, inference and encode threads
+VIDEO_QUEUE_SIZE = 32
+# Frames whose downsampled grayscale thumbnail differs from the last detected frame
+# by less than this mean absolute difference reuse its detections instead of running the model
+STATIC_FRAME_THRESHOLD = 2.0
+STATIC_FRAME_THUMBNAIL_SIZE = (64, 64)
+# Maximum number of pixmaps kept in each image display cache
+PIXMAP_CACHE_SIZE = 16
+# Delay (ms) after the last resize event before the image is rescaled smoothly
+RESIZE_DEBOUNCE_MS = 100
+# Minimum time (s) between two progress updates sent from the video loop (~30 Hz)
+PROGRESS_MIN_INTERVAL = 1 / 30
+# BGR box colors, indexed by class id (wraps around for larger class ids)
+BOX_COLORS = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+]
 
 def get_model_path():
     if getattr(sys, 'frozen', False):
@@ -37,6 +82,260 @@ def get_model_path():
         model_path = os.path.abspath('trenirani modeli/best.pt')
     return model_path
 
+def get_engine_path(model_path):
+    # TensorRT engine is stored next to the .pt file (best.pt -> best.engine)
+    return os.path.splitext(model_path)[0] + '.engine'
+
+def get_engine_digest_path(engine_path):
+    # Content hash of the .pt file the engine was exported from (best.engine -> best.engine.digest)
+    return engine_path + '.digest'
+
+def read_engine_digest(engine_path):
+    try:
+        with open(get_engine_digest_path(engine_path)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def load_model(model_path, model_digest, half=True):
+    # Prefer a cached FP16 TensorRT engine on NVIDIA GPUs; it is (re-)exported when it is
+    # missing or was exported from a different best.pt, and only when TensorRT is installed.
+    # Falls back to the plain PyTorch weights when the engine can't be exported or used here.
+    # Returns the warmed-up model and its backend ('engine' or 'pt').
+    from ultralytics import YOLO
+    engine_path = get_engine_path(model_path)
+    engine_is_current = os.path.exists(engine_path) and read_engine_digest(engine_path) == model_digest
+    if not engine_is_current and importlib.util.find_spec('tensorrt') is not None:
+        try:
+            import torch
+            if torch.cuda.is_available():
+                engine_path = YOLO(model_path).export(format='engine', half=True, dynamic=True, batch=16, imgsz=640)
+                with open(get_engine_digest_path(engine_path), 'w') as f:
+                    f.write(model_digest)
+                engine_is_current = True
+        except Exception as e:
+            print(f"TensorRT export failed, using PyTorch model: {e}")
+    if engine_is_current:
+        try:
+            model = YOLO(engine_path, task='detect')
+            warm_up_model(model, half)
+            return model, 'engine'
+        except Exception as e:
+            # E.g. no CUDA, or an engine built for another GPU/TensorRT version
+            print(f"TensorRT engine {engine_path} could not be used, using PyTorch model: {e}")
+    model = YOLO(model_path)
+    warm_up_model(model, half)
+    return model, 'pt'
+
+def warm_up_model(model, half=True):
+    # A dummy forward pass creates the CUDA/TensorRT context before the first real prediction.
+    # The first call also sets up the predictor, which fixes the FP16/FP32 mode for all later
+    # calls (a per-call half= is ignored afterwards), so it must get the chosen precision.
+    model(np.zeros((640, 640, 3), dtype=np.uint8), half=half, verbose=False)
+
+def model_uses_half(model):
+    # Precision the set up predictor actually runs at: FP16 needs CUDA, and TensorRT
+    # engines keep the precision they were exported with
+    return bool(getattr(model.predictor.model, 'fp16', False))
+
+def release_gpu_memory():
+    # Returns cached CUDA memory to the driver (no-op without torch/CUDA)
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+def read_video_metadata(file_path):
+    # Returns (total_frames, fps, width, height) of a video, read with a single open.
+    # PyAV reads the container metadata, which is more reliable than CAP_PROP_FRAME_COUNT
+    # on VBR/mkv files; OpenCV is used when PyAV is not installed.
+    import cv2
+    try:
+        import av
+    except ImportError:
+        av = None
+    if av is not None:
+        with av.open(file_path) as container:
+            stream = container.streams.video[0]
+            fps = float(stream.average_rate or stream.guessed_rate or 0)
+            total_frames = stream.frames
+            if not total_frames and stream.duration and stream.time_base:
+                total_frames = int(stream.duration * stream.time_base * fps)
+            if not total_frames:
+                # No usable metadata: count packets (demux only, no decoding)
+                total_frames = sum(1 for packet in container.demux(stream) if packet.size)
+            return total_frames, fps, stream.codec_context.width, stream.codec_context.height
+
+    cap = cv2.VideoCapture(file_path)
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+    return max(total_frames, 0), fps, width, height
+
+def iter_video_frames(file_path):
+    # Yields BGR frames of a video. Uses PyAV with NVDEC (CUDA) hardware decoding when
+    # PyAV is installed, otherwise decodes on the CPU with cv2.VideoCapture.
+    try:
+        import av
+        from av.codec.hwaccel import HWAccel
+        container = av.open(file_path, hwaccel=HWAccel(device_type='cuda'))
+    except Exception:
+        container = None
+    if container is not None:
+        try:
+            for frame in container.decode(video=0):
+                yield frame.to_ndarray(format='bgr24')
+        finally:
+            container.close()
+        return
+
+    import cv2
+    cap = cv2.VideoCapture(file_path)
+    try:
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+class NvencVideoWriter:
+    # Minimal cv2.VideoWriter replacement (write/release) that encodes H.264
+    # on the GPU with NVENC through PyAV
+    def __init__(self, out_path, fps, width, height):
+        import av
+        from fractions import Fraction
+        self.av = av
+        self.container = av.open(out_path, mode='w')
+        try:
+            rate = Fraction(fps).limit_denominator(1001) if fps > 0 else Fraction(30)
+            self.stream = self.container.add_stream('h264_nvenc', rate=rate)
+            self.stream.width = width
+            self.stream.height = height
+            self.stream.pix_fmt = 'yuv420p'
+            self.stream.codec_context.open() # Fails here if NVENC is not available
+        except Exception:
+            self.container.close()
+            raise
+
+    def write(self, frame):
+        video_frame = self.av.VideoFrame.from_ndarray(frame, format='bgr24')
+        for packet in self.stream.encode(video_frame):
+            self.container.mux(packet)
+
+    def release(self):
+        for packet in self.stream.encode(): # Flush the encoder
+            self.container.mux(packet)
+        self.container.close()
+
+def open_video_writer(out_path, fps, width, height):
+    # Uses the NVENC hardware encoder when PyAV and an NVIDIA GPU are available,
+    # otherwise the software mp4v encoder of OpenCV
+    import cv2
+    if width % 2 == 0 and height % 2 == 0: # yuv420p needs even dimensions
+        try:
+            return NvencVideoWriter(out_path, fps, width, height)
+        except Exception:
+            pass
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(out_path, fourcc, fps, (width, height))
+
+def draw_detections(frame, result):
+    # Draws the detected boxes of a YOLO result directly into frame (in place),
+    # avoiding the extra frame copy made by result.plot()
+    import cv2
+    boxes = result.boxes
+    xyxy = boxes.xyxy.cpu().numpy().astype(int)
+    class_ids = boxes.cls.cpu().numpy().astype(int)
+    confidences = boxes.conf.cpu().numpy()
+    for (x1, y1, x2, y2), class_id, conf in zip(xyxy, class_ids, confidences):
+        color = BOX_COLORS[class_id % len(BOX_COLORS)]
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        label = f"{result.names[class_id]} {conf:.2f}"
+        cv2.putText(frame, label, (x1, max(y1 - 5, 15)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
+    return frame
+
+def frame_thumbnail(frame):
+    # Small grayscale version of a frame, used for cheap static-frame detection
+    import cv2
+    small = cv2.resize(frame, STATIC_FRAME_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+def thumbnail_difference(a, b):
+    import cv2
+    return cv2.absdiff(a, b).mean()
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    # Content hash of a file, read in chunks so large videos are not loaded into memory
+    h = new_file_hash()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def clear_directory(path):
+    # Removes everything inside path, but keeps the directory itself
+    for entry in os.scandir(path):
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+
+def prune_result_cache(max_bytes=RESULT_CACHE_MAX_BYTES):
+    # Removes the least recently used result cache entries (oldest mtime first; cache hits
+    # refresh the mtime) until the cache fits in max_bytes
+    entries = []
+    with os.scandir(RESULT_CACHE_DIR) as it:
+        for entry in it:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        os.remove(path)
+        total_size -= size
+
+def cache_put(cache, key, value):
+    # Insert into a dict used as a small cache, evicting the oldest entry when full
+    cache[key] = value
+    if len(cache) > PIXMAP_CACHE_SIZE:
+        del cache[next(iter(cache))]
+
+# --- 0. Model Loader ---
+# Loads and warms up the YOLO model on a QThreadPool thread at startup,
+# so the window is shown immediately and the model is ready by the first Detect click.
+class ModelLoaderSignals(QObject):
+    loaded = pyqtSignal(object, str) # Emits the loaded model and its identity (content hash + backend)
+    error = pyqtSignal(str) # Emits error message
+
+class ModelLoader(QRunnable):
+    def __init__(self, model_path, half=True):
+        super().__init__()
+        self.model_path = model_path
+        self.half = half # Precision the predictor is set up with during warm-up
+        self.signals = ModelLoaderSignals()
+
+    def run(self):
+        if not os.path.exists(self.model_path):
+            self.signals.error.emit(f"YOLO model not found at: {self.model_path}")
+            return
+        try:
+            model_digest = file_digest(self.model_path)
+            model, backend = load_model(self.model_path, model_digest, self.half)
+            # The backend is part of the identity: engine (FP16) and .pt results can differ slightly
+            self.signals.loaded.emit(model, f"{model_digest}:{backend}")
+        except Exception as e:
+            self.signals.error.emit(f"Error loading YOLO model {self.model_path}: {e}")
+
 # --- 1. Prediction Worker Thread ---
 # This class runs the YOLO prediction in a separate thread
 # to prevent the UI from freezing during processing.
@@ -46,56 +345,64 @@ class PredictionWorker(QThread):
     error = pyqtSignal(str) # Emits error message
     progress = pyqtSignal(int) # Emits current progress (0-100)
 
-    def __init__(self, model_path, input_files):
+    def __init__(self, model, input_files, temp_output_dir, half=True, model_digest=None):
         super().__init__()
-        self.model_path = model_path
+        self.model = model # Already loaded YOLO model, shared between runs
         self.input_files = input_files
-        self.model = None
-        self.temp_output_dir = None # To store YOLO's output
+        self.half = half # Requested FP16 inference (see model_uses_half for the precision actually used)
+        self.effective_half = half # Precision actually used, set in run() once the predictor is set up
+        self.model_digest = model_digest # Identity of the loaded model (hash + backend); None disables the result cache
+        self._stored_cached_results = False # Set once a result was stored in the cache during this run
+        self.annotated_images = {} # In-memory annotated images (QImage), keyed by their display path
+        self._last_progress = -1
+        self._last_progress_time = 0.0
+        self._reference_thumbnail = None # Thumbnail of the last frame that went through the model
+        self._last_result = None # Detections of that frame, reused for static frames
+        self.temp_output_dir = temp_output_dir # Session temp directory for YOLO's output (reused between runs)
 
     def run(self):
         try:
-            # Load the YOLO model
-            self.model = YOLO(self.model_path)
-
-            # Create a unique temporary directory for this prediction run's output
-            self.temp_output_dir = tempfile.mkdtemp(prefix="yolo_output_")
             print(f"YOLO output will be saved to: {self.temp_output_dir}")
 
+            # The app resets the predictor when the precision was changed; set it up again
+            if self.model.predictor is None:
+                warm_up_model(self.model, self.half)
+            self.effective_half = model_uses_half(self.model)
+
+            # Create the output directories of all videos up front
+            video_save_dirs = {
+                i: os.path.join(self.temp_output_dir, f"video_{i}")
+                for i, file_path in enumerate(self.input_files)
+                if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS
+            }
+            for video_save_dir in video_save_dirs.values():
+                os.makedirs(video_save_dir, exist_ok=True)
+
             processed_file_paths = []
+            processed_by_digest = {} # Content hash -> processed output, to skip duplicate inputs
             total_files = len(self.input_files)
 
             for i, file_path in enumerate(self.input_files):
+                digest = file_digest(file_path)
+                if digest in processed_by_digest:
+                    processed_file_paths.append(
+                        self.reuse_output(processed_by_digest[digest], i, file_path)
+                    )
+                    continue
+
                 ext = os.path.splitext(file_path)[1].lower()
-                if ext in ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']:
-                    # --- Video: process frame by frame ---
-                    cap = cv2.VideoCapture(file_path)
-                    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                    frame_idx = 0
-                    video_save_dir = os.path.join(self.temp_output_dir, f"video_{i}")
-                    os.makedirs(video_save_dir, exist_ok=True)
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    out_path = os.path.join(video_save_dir, os.path.basename(file_path))
-                    fps = cap.get(cv2.CAP_PROP_FPS)
-                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    out = cv2.VideoWriter(out_path, fourcc, fps, (width, height))
-                    while cap.isOpened():
-                        ret, frame = cap.read()
-                        if not ret:
-                            break
-                        # Run detection on frame
-                        results = self.model(frame)
-                        if results and len(results) > 0:
-                            frame_with_boxes = results[0].plot()
-                            out.write(frame_with_boxes)
-                        else:
-                            out.write(frame)
-                        frame_idx += 1
-                        progress = int((frame_idx / total_frames) * 100)
-                        self.progress.emit(progress)
-                    cap.release()
-                    out.release()
+                cached_path = self.get_cached_result_path(digest, ext)
+                if cached_path and os.path.exists(cached_path):
+                    processed_path = self.copy_to_output(cached_path, f"cached_{i}", file_path)
+                    self.touch_cached_result(cached_path)
+                    processed_file_paths.append(processed_path)
+                    processed_by_digest[digest] = processed_path
+                    continue
+
+                if ext in VIDEO_EXTENSIONS:
+                    # --- Video: decode, detect and encode in a pipeline ---
+                    out_path = os.path.join(video_save_dirs[i], os.path.basename(file_path))
+                    self.process_video(file_path, out_path)
                     processed_file_paths.append(out_path)
                     self.progress.emit(100)  # Ensure 100% at end
                 else:
@@ -105,7 +412,9 @@ class PredictionWorker(QThread):
                         file_path,
                         save=True,
                         project=self.temp_output_dir,
-                        name='prediction_run'
+                        name='prediction_run',
+                        half=self.half,
+                        verbose=False
                     )
                     if results and len(results) > 0:
                         yolo_save_dir = results[0].save_dir
@@ -117,12 +426,12 @@ class PredictionWorker(QThread):
                             print(f"Warning: Processed file not found at {processed_path}")
                             if file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
                                 img_with_boxes_np = results[0].plot()
-                                img_with_boxes_rgb = cv2.cvtColor(img_with_boxes_np, cv2.COLOR_BGR2RGB)
-                                h, w, ch = img_with_boxes_rgb.shape
+                                h, w, ch = img_with_boxes_np.shape
                                 bytes_per_line = ch * w
-                                qImg = QImage(img_with_boxes_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
+                                # Wrap the BGR buffer directly; copy() because the numpy buffer is freed afterwards
+                                qImg = QImage(img_with_boxes_np.data, w, h, bytes_per_line, QImage.Format_BGR888).copy()
                                 temp_img_path = os.path.join(self.temp_output_dir, f"annotated_{original_filename}")
-                                qImg.save(temp_img_path)
+                                self.annotated_images[temp_img_path] = qImg
                                 processed_file_paths.append(temp_img_path)
                             else:
                                 self.error.emit(f"Could not locate or display processed file for: {original_filename}")
@@ -130,13 +439,225 @@ class PredictionWorker(QThread):
                     else:
                         self.error.emit(f"YOLO did not return results for {file_path}")
                         return
+                processed_by_digest[digest] = processed_file_paths[-1]
+                if cached_path and processed_file_paths[-1] not in self.annotated_images:
+                    self.store_cached_result(processed_file_paths[-1], cached_path)
+            if self._stored_cached_results:
+                try:
+                    prune_result_cache()
+                except OSError as e:
+                    print(f"Warning: Could not prune result cache {RESULT_CACHE_DIR}: {e}")
             self.progress.emit(100)
             self.finished.emit(processed_file_paths, self.temp_output_dir)
         except Exception as e:
-            if self.temp_output_dir and os.path.exists(self.temp_output_dir):
-                shutil.rmtree(self.temp_output_dir)
+            if os.path.exists(self.temp_output_dir):
+                clear_directory(self.temp_output_dir)
             self.error.emit(f"Error during prediction: {e}")
 
+    def reuse_output(self, processed_path, i, file_path):
+        # Output for an input identical to an already processed file: copy instead of running the model
+        if processed_path in self.annotated_images:
+            duplicate_path = os.path.join(self.temp_output_dir, f"annotated_{i}_{os.path.basename(file_path)}")
+            self.annotated_images[duplicate_path] = self.annotated_images[processed_path]
+            return duplicate_path
+        return self.copy_to_output(processed_path, f"duplicate_{i}", file_path)
+
+    def copy_to_output(self, src_path, subdir_name, file_path):
+        # Copies an already processed result into this run's output dir under the input's name
+        output_dir = os.path.join(self.temp_output_dir, subdir_name)
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, os.path.basename(file_path))
+        shutil.copy(src_path, output_path)
+        return output_path
+
+    def get_cached_result_path(self, digest, ext):
+        # Result cache entries are keyed by (model hash, file hash, inference settings)
+        if self.model_digest is None:
+            return None
+        key = new_file_hash(f"{self.model_digest}:{digest}:half={self.effective_half}".encode()).hexdigest()
+        return os.path.join(RESULT_CACHE_DIR, key + ext)
+
+    def touch_cached_result(self, cached_path):
+        # Marks a cache entry as recently used, so prune_result_cache keeps it longer
+        try:
+            os.utime(cached_path)
+        except OSError:
+            pass
+
+    def store_cached_result(self, processed_path, cached_path):
+        # A failing cache write must not fail the prediction run
+        try:
+            if os.path.getsize(processed_path) > RESULT_CACHE_MAX_BYTES:
+                return # Would evict the whole cache and then itself
+            os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+            tmp_path = cached_path + ".tmp"
+            shutil.copy(processed_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+            self._stored_cached_results = True
+        except OSError as e:
+            print(f"Warning: Could not store result in cache {cached_path}: {e}")
+
+    def process_video(self, file_path, out_path):
+        # Decoding, inference and encoding run in three threads connected by bounded
+        # queues, so the GPU is not idle while frames are read or written on the CPU.
+        # The writer is only opened at the first frame with a detection; a video without
+        # any detections is copied as it is, without encoding a single frame.
+        total_frames, fps, width, height = read_video_metadata(file_path)
+        out = None
+        self._reference_thumbnail = None
+        self._last_result = None
+
+        decode_q = queue.Queue(maxsize=VIDEO_QUEUE_SIZE)
+        encode_q = queue.Queue(maxsize=VIDEO_QUEUE_SIZE)
+        stop_event = threading.Event()
+        pipeline_errors = [] # Exceptions raised in the decoder/encoder threads
+
+        def put(q, item):
+            # Blocks while the queue is full, but gives up once the pipeline is stopped
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def decode():
+            frames = iter_video_frames(file_path)
+            try:
+                for frame in frames:
+                    if not put(decode_q, frame):
+                        return
+            except Exception as e:
+                pipeline_errors.append(e)
+            finally:
+                frames.close()
+            put(decode_q, None)  # End of stream (also sent after a decode error)
+
+        def write_leading_frames(count):
+            # The frames before the first detection were not kept: decode them again
+            frames = iter_video_frames(file_path)
+            try:
+                for _, frame in zip(range(count), frames):
+                    if stop_event.is_set():
+                        return
+                    out.write(frame)
+            finally:
+                frames.close()
+
+        def encode():
+            nonlocal out
+            leading_frames = 0 # Frames without detections seen before the writer was opened
+            try:
+                while True:
+                    try:
+                        item = encode_q.get(timeout=0.1)
+                    except queue.Empty:
+                        if stop_event.is_set():
+                            return
+                        continue
+                    if item is None:
+                        break
+                    frame, has_detections = item
+                    if out is None:
+                        if not has_detections:
+                            leading_frames += 1
+                            continue
+                        out = open_video_writer(out_path, fps, width, height)
+                        write_leading_frames(leading_frames)
+                    out.write(frame)
+            except Exception as e:
+                pipeline_errors.append(e)
+                stop_event.set()
+            finally:
+                if out is not None:
+                    out.release()
+
+        decoder = threading.Thread(target=decode, daemon=True)
+        encoder = threading.Thread(target=encode, daemon=True)
+        decoder.start()
+        encoder.start()
+        frame_idx = 0
+        batch = []
+        end_of_stream = False
+        try:
+            while not end_of_stream and not stop_event.is_set():
+                # Timeout so a failed encoder (which sets stop_event) can't leave this waiting
+                # for a frame the stopped decoder will never send
+                try:
+                    frame = decode_q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if frame is None:
+                    end_of_stream = True
+                else:
+                    batch.append(frame)
+                if batch and (end_of_stream or len(batch) == VIDEO_BATCH_SIZE):
+                    annotated_frames, frame_detections = self.annotate_frames(batch)
+                    for annotated, detection_count in zip(annotated_frames, frame_detections):
+                        put(encode_q, (annotated, detection_count > 0))
+                    frame_idx += len(batch)
+                    batch = []
+                    if total_frames > 0:
+                        self.emit_progress(min(int((frame_idx / total_frames) * 100), 100))
+        finally:
+            if end_of_stream:
+                put(encode_q, None)  # Let the encoder drain the queue and finish
+            else:
+                stop_event.set()  # Aborted: stop both threads
+            encoder.join()
+            stop_event.set()
+            decoder.join()
+            self._last_result = None
+            release_gpu_memory()
+        if pipeline_errors:
+            raise pipeline_errors[0]
+        if out is None:
+            # Nothing was drawn, so the original file is the output
+            shutil.copy(file_path, out_path)
+
+    def emit_progress(self, progress):
+        # Emits only when the percentage changes, and at most once per PROGRESS_MIN_INTERVAL,
+        # so long videos don't flood the UI event loop with queued signals
+        now = time.monotonic()
+        if progress == self._last_progress or now - self._last_progress_time < PROGRESS_MIN_INTERVAL:
+            return
+        self._last_progress = progress
+        self._last_progress_time = now
+        self.progress.emit(progress)
+
+    def annotate_frames(self, frames):
+        # Run detection on a batch of frames in one model call.
+        # Returns the annotated frames and the number of detections in each frame;
+        # frames without detections are passed through untouched.
+        # Frames that barely differ from the last detected frame skip the model and reuse its boxes.
+        infer_indices = []
+        for idx, frame in enumerate(frames):
+            thumbnail = frame_thumbnail(frame)
+            if (self._reference_thumbnail is None or
+                    thumbnail_difference(thumbnail, self._reference_thumbnail) >= STATIC_FRAME_THRESHOLD):
+                infer_indices.append(idx)
+                self._reference_thumbnail = thumbnail
+        results = {}
+        if infer_indices:
+            # stream=True yields results one by one; keeping only CPU copies lets the
+            # GPU tensors of each result be freed right away
+            batch_results = self.model(
+                [frames[idx] for idx in infer_indices], half=self.half, stream=True, verbose=False
+            )
+            results = {idx: result.cpu() for idx, result in zip(infer_indices, batch_results)}
+
+        annotated_frames = []
+        frame_detections = []
+        for idx, frame in enumerate(frames):
+            result = results.get(idx, self._last_result)
+            self._last_result = result
+            if len(result.boxes) > 0:
+                draw_detections(frame, result)
+            annotated_frames.append(frame)
+            frame_detections.append(len(result.boxes))
+        return annotated_frames, frame_detections
+
 # --- 2. Main Application Window ---
 class BearDetectionApp(QWidget):
     def __init__(self):
@@ -146,19 +667,45 @@ class BearDetectionApp(QWidget):
 
         self.input_files = [] # Stores paths of uploaded files
         self.prediction_thread = None
-        self.current_temp_output_dir = None # To keep track of the current temp dir for cleanup
+        self.current_temp_output_dir = None # Set while the temp dir holds results that need cleanup
+        # One temp directory for the whole session, emptied between runs and removed on exit
+        self.temp_output_dir = tempfile.mkdtemp(prefix="yolo_output_")
+        atexit.register(shutil.rmtree, self.temp_output_dir, ignore_errors=True)
         self.current_image_index = 0
         self.current_video_index = 0
         self.image_paths = []
         self.video_paths = []
+        self.annotated_images = {} # Annotated images kept in memory instead of temp files
+        self._pixmap_cache = {} # Decoded source pixmaps, keyed by path
+        self._scaled_cache = {} # Smoothly scaled pixmaps, keyed by (path, width, height)
         
         # Video player components
         self.media_player = QMediaPlayer(None, QMediaPlayer.VideoSurface)
         self.position_timer = QTimer()
         self.position_timer.timeout.connect(self.update_position)
 
+        # Debounces resize events so the smooth rescale only runs once the resize stops
+        self.resize_timer = QTimer()
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_DEBOUNCE_MS)
+        self.resize_timer.timeout.connect(self.update_image_display)
+
+        # The YOLO model is loaded once in the background and reused for every prediction run
+        self.model = None
+        self.model_digest = None # Identity of the loaded model (hash + backend), part of the result cache key
+        self.model_error = None # Why the model could not be loaded, shown when Detect is clicked
+
         self.init_ui()
 
+        self.predict_button.setEnabled(False)
+        self.predict_button.setText("Loading model...")
+        # Precision the model's predictor is currently set up with
+        self.model_half = self.half_precision_checkbox.isChecked()
+        self.model_loader = ModelLoader(get_model_path(), self.model_half)
+        self.model_loader.signals.loaded.connect(self.model_loaded)
+        self.model_loader.signals.error.connect(self.model_load_error)
+        QThreadPool.globalInstance().start(self.model_loader)
+
     def init_ui(self):
         main_layout = QHBoxLayout(self) # Main horizontal layout for left and right panels
 
@@ -257,6 +804,24 @@ class BearDetectionApp(QWidget):
         self.predict_button.setVisible(False)
         left_panel_layout.addWidget(self.predict_button)
 
+        # Precision mode (FP16 halves memory traffic on GPUs, with no meaningful accuracy loss)
+        self.half_precision_checkbox = QCheckBox("Half precision (FP16)")
+        self.half_precision_checkbox.setChecked(True)
+        self.half_precision_checkbox.setStyleSheet("font-size: 14px; padding: 5px;")
+        left_panel_layout.addWidget(self.half_precision_checkbox)
+
+        # Persistent result cache (copies of processed files in RESULT_CACHE_DIR)
+        self.result_cache_checkbox = QCheckBox("Cache results")
+        self.result_cache_checkbox.setChecked(True)
+        self.result_cache_checkbox.setToolTip(f"Keep processed files in {RESULT_CACHE_DIR} to reuse them")
+        self.result_cache_checkbox.setStyleSheet("font-size: 14px; padding: 5px;")
+        left_panel_layout.addWidget(self.result_cache_checkbox)
+
+        clear_cache_button = QPushButton("Clear Cache")
+        clear_cache_button.setStyleSheet("font-size: 14px; padding: 5px;")
+        clear_cache_button.clicked.connect(self.clear_result_cache)
+        left_panel_layout.addWidget(clear_cache_button)
+
         # Progress bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, 100)
@@ -539,12 +1104,15 @@ class BearDetectionApp(QWidget):
             self.cleanup_temp_dir()
 
     def separate_media_files(self, file_paths):
-        # Separate images and videos
-        image_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
-        video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv')
-        
-        self.image_paths = [f for f in file_paths if os.path.splitext(f)[1].lower() in image_extensions]
-        self.video_paths = [f for f in file_paths if os.path.splitext(f)[1].lower() in video_extensions]
+        # Separate images and videos in a single pass
+        self.image_paths = []
+        self.video_paths = []
+        for f in file_paths:
+            ext = os.path.splitext(f)[1].lower()
+            if ext in IMAGE_EXTENSIONS:
+                self.image_paths.append(f)
+            elif ext in VIDEO_EXTENSIONS:
+                self.video_paths.append(f)
         
         self.current_image_index = 0
         self.current_video_index = 0
@@ -561,7 +1129,17 @@ class BearDetectionApp(QWidget):
         elif self.image_paths and self.video_paths:
             self.media_tabs.setCurrentIndex(0)  # Default to images tab
 
-    def update_image_display(self):
+    def get_source_pixmap(self, path):
+        pixmap = self._pixmap_cache.get(path)
+        if pixmap is None:
+            if path in self.annotated_images:
+                pixmap = QPixmap.fromImage(self.annotated_images[path])
+            else:
+                pixmap = QPixmap(path)
+            cache_put(self._pixmap_cache, path, pixmap)
+        return pixmap
+
+    def update_image_display(self, transformation=Qt.SmoothTransformation):
         if not self.image_paths:
             self.image_label.setText("No images to display")
             self.image_counter_label.setText("0 / 0")
@@ -570,16 +1148,19 @@ class BearDetectionApp(QWidget):
             return
         
         current_path = self.image_paths[self.current_image_index]
-        pixmap = QPixmap(current_path)
+        pixmap = self.get_source_pixmap(current_path)
         
         if not pixmap.isNull():
             label_size = self.image_label.size()
-            scaled_pixmap = pixmap.scaled(
-                label_size.width() - 20, 
-                label_size.height() - 20, 
-                Qt.KeepAspectRatio, 
-                Qt.SmoothTransformation
-            )
+            width = label_size.width() - 20
+            height = label_size.height() - 20
+            key = (current_path, width, height)
+            scaled_pixmap = self._scaled_cache.get(key)
+            if scaled_pixmap is None:
+                scaled_pixmap = pixmap.scaled(width, height, Qt.KeepAspectRatio, transformation)
+                # Only the final smooth result is worth keeping
+                if transformation == Qt.SmoothTransformation:
+                    cache_put(self._scaled_cache, key, scaled_pixmap)
             self.image_label.setPixmap(scaled_pixmap)
         else:
             self.image_label.setText(f"Could not load image: {os.path.basename(current_path)}")
@@ -654,7 +1235,9 @@ class BearDetectionApp(QWidget):
 
     def resizeEvent(self, event):
         if hasattr(self, 'image_paths') and self.image_paths and self.main_display_stack.currentIndex() == 1:
-            self.update_image_display()
+            # Cheap rescale while resizing, smooth rescale once the resize has settled
+            self.update_image_display(Qt.FastTransformation)
+            self.resize_timer.start()
         super().resizeEvent(event)
 
     def run_prediction(self):
@@ -667,24 +1250,60 @@ class BearDetectionApp(QWidget):
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
 
-        model_path = get_model_path()
-        if not os.path.exists(model_path):
+        if self.model is None:
+            model_path = get_model_path()
+            details = f"\n\n{self.model_error}" if self.model_error else ""
             QMessageBox.critical(self, "Model Not Found",
-                                 f"YOLO model not found at: {model_path}\nPlease ensure the model path is correct and the model file exists.")
+                                 f"YOLO model could not be loaded from: {model_path}\nPlease ensure the model path is correct and the model file exists.{details}")
             self.predict_button.setEnabled(True)
             self.progress_bar.setVisible(False)
             return
 
-        self.prediction_thread = PredictionWorker(model_path, self.input_files)
+        half = self.half_precision_checkbox.isChecked()
+        if half != self.model_half:
+            # The predictor keeps the precision it was set up with; the worker rebuilds it
+            self.model.predictor = None
+            self.model_half = half
+        self.prediction_thread = PredictionWorker(
+            self.model, self.input_files, self.temp_output_dir,
+            half=half,
+            model_digest=self.model_digest if self.result_cache_checkbox.isChecked() else None
+        )
         self.prediction_thread.finished.connect(self.prediction_finished)
         self.prediction_thread.error.connect(self.prediction_error)
         self.prediction_thread.progress.connect(self.progress_bar.setValue)
         self.prediction_thread.start()
 
+    def clear_result_cache(self):
+        if self.prediction_thread and self.prediction_thread.isRunning():
+            QMessageBox.warning(self, "Detection Running", "The result cache can't be cleared while detection is running.")
+            return
+        try:
+            if os.path.isdir(RESULT_CACHE_DIR):
+                shutil.rmtree(RESULT_CACHE_DIR)
+        except OSError as e:
+            QMessageBox.critical(self, "Cache Error", f"Could not clear the result cache {RESULT_CACHE_DIR}: {e}")
+            return
+        QMessageBox.information(self, "Cache Cleared", f"Cached results were removed from {RESULT_CACHE_DIR}.")
+
+    def model_loaded(self, model, model_digest):
+        self.model = model
+        self.model_digest = model_digest
+        self.predict_button.setText("Detect")
+        self.predict_button.setEnabled(True)
+
+    def model_load_error(self, message):
+        # Detect stays clickable and reports the error when pressed
+        print(message)
+        self.model_error = message
+        self.predict_button.setText("Detect")
+        self.predict_button.setEnabled(True)
+
     def prediction_finished(self, processed_file_paths, temp_output_dir):
         self.predict_button.setEnabled(True)
         self.progress_bar.setVisible(False)
         self.current_temp_output_dir = temp_output_dir
+        self.annotated_images = self.prediction_thread.annotated_images
         self.separate_media_files(processed_file_paths)
         QMessageBox.information(self, "Prediction Complete", "Object detection finished successfully!")
 
@@ -695,10 +1314,17 @@ class BearDetectionApp(QWidget):
         QMessageBox.critical(self, "Prediction Error", f"An error occurred: {message}")
 
     def cleanup_temp_dir(self):
+        self.annotated_images = {}
+        self._pixmap_cache.clear()
+        self._scaled_cache.clear()
         if self.current_temp_output_dir and os.path.exists(self.current_temp_output_dir):
+            # The player keeps the shown video open (on Windows it then can't be removed),
+            # and the next run writes its output to the same paths
+            self.media_player.stop()
+            self.media_player.setMedia(QMediaContent())
             try:
                 print(f"Cleaning up temporary directory: {self.current_temp_output_dir}")
-                shutil.rmtree(self.current_temp_output_dir)
+                clear_directory(self.current_temp_output_dir)
                 self.current_temp_output_dir = None
             except Exception as e:
                 print(f"Error cleaning up temp directory {self.current_temp_output_dir}: {e}")
@@ -719,7 +1345,11 @@ class BearDetectionApp(QWidget):
         save_path, _ = QFileDialog.getSaveFileName(self, "Save Image", os.path.basename(current_path), "Image Files (*.png *.jpg *.jpeg *.bmp *.gif);;All Files (*)", options=options)
         if save_path:
             try:
-                shutil.copy(current_path, save_path)
+                if current_path in self.annotated_images:
+                    if not self.annotated_images[current_path].save(save_path):
+                        raise IOError(f"could not write {save_path}")
+                else:
+                    shutil.copy(current_path, save_path)
                 QMessageBox.information(self, "Download Complete", f"Image saved to: {save_path}")
             except Exception as e:
                 QMessageBox.critical(self, "Download Error", f"Failed to save image: {e}")
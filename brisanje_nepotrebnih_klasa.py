@@ -1,5 +1,37 @@
+import mmap
 import os
+import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import _yolo_txt
+from _dataset_utils import MAX_WORKERS, atomic_write
+
+# Matches the leading class id of an annotation line (raw bytes, no decoding or splitting needed)
+_LEAD = re.compile(rb"\s*(\d+)(?=\s|$)")
+
+# Progress is printed once every this many files instead of once per file
+PROGRESS_EVERY = 500
+
+# Write buffer for rewritten files (coalesces the kept lines into few large writes)
+WRITE_BUFFER_SIZE = 256 * 1024
+
+# Files larger than this are memory-mapped instead of read through a file buffer
+MMAP_MIN_SIZE = 64 * 1024
+
+
+def _iter_lines(f):
+    """
+    Yields the lines of a file opened in binary mode.
+    Large files are scanned through mmap (the OS pages them in on demand, without the
+    extra copy of read()); for small files mmap setup costs more than it saves.
+    """
+    if os.fstat(f.fileno()).st_size > MMAP_MIN_SIZE:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter(mm.readline, b"")
+    else:
+        yield from f
 
 def filter_yolo_annotations():
     """
@@ -29,43 +61,80 @@ def filter_yolo_annotations():
     print(f"\nFiltering started. Will only keep classes: {sorted(list(desired_classes))}")
     print(f"Processing folder: '{folder_name}'...\n")
 
-    processed_files_count = 0
-    # --- 4. Iterate over all files in the specified folder ---
-    for filename in os.listdir(folder_name):
-        # We only care about the .txt annotation files
-        if filename.endswith(".txt"):
-            file_path = os.path.join(folder_name, filename)
-            
-            lines_to_keep = []
-
-            try:
-                # Open the file for reading
-                with open(file_path, 'r') as f:
-                    lines = f.readlines()
-
-                # Check each line in the file
-                for line in lines:
-                    # Skip empty lines
-                    if line.strip() == "":
-                        continue
-                    
-                    # The first number on the line is the class ID
-                    parts = line.strip().split()
-                    class_id = int(parts[0])
-
-                    # --- 5. The core logic: check if the class is desired ---
-                    if class_id in desired_classes:
-                        lines_to_keep.append(line)
-
-                # --- 6. Overwrite the original file with the filtered lines ---
-                with open(file_path, 'w') as f:
-                    f.writelines(lines_to_keep)
-                
-                print(f"  - Processed: {filename}")
-                processed_files_count += 1
-
-            except Exception as e:
+    print_lock = threading.Lock()
+    done_count = 0  # Files handled so far (for progress output), guarded by print_lock
+
+    def report_done():
+        nonlocal done_count
+        with print_lock:
+            done_count += 1
+            if done_count % PROGRESS_EVERY == 0:
+                print(f"  - {done_count}/{len(txt_entries)} files done")
+
+    def process_file(entry):
+        """Filters one annotation file. Returns True if it was processed successfully."""
+        filename = entry.name
+        file_path = entry.path
+
+        lines_to_keep = []
+
+        try:
+            if _yolo_txt.AVAILABLE:
+                # Compiled (Numba) scan over the whole file, same rules as the loop below;
+                # large files are scanned in place through mmap, like in _iter_lines
+                with open(file_path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size > MMAP_MIN_SIZE:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            filtered, changed = _yolo_txt.filter_lines(mm, desired_classes)
+                    else:
+                        filtered, changed = _yolo_txt.filter_lines(f.read(), desired_classes)
+                lines_to_keep.append(filtered)
+            else:
+                line_count = 0
+                # Open the file for reading (binary: lines are kept as raw bytes)
+                # and check each line as it is read
+                with open(file_path, 'rb') as f:
+                    for line in _iter_lines(f):
+                        line_count += 1
+                        # The first number on the line is the class ID
+                        m = _LEAD.match(line)
+                        if m is None:
+                            # Skip empty lines
+                            if line.strip() == b"":
+                                continue
+                            raise ValueError(f"invalid class id in line: {line!r}")
+
+                        # --- 5. The core logic: check if the class is desired ---
+                        # (int() so that e.g. '01' is class 1, like in the annotation tools)
+                        if int(m.group(1)) in desired_classes:
+                            lines_to_keep.append(line)
+                changed = len(lines_to_keep) != line_count
+
+            # --- 6. Replace the original file with the filtered lines ---
+            # (only if something was actually removed, most files are already conformant).
+            # Writing to a temp file and renaming it over the original is atomic,
+            # so the annotation file is never left truncated.
+            if changed:
+                atomic_write(file_path, lines_to_keep, buffering=WRITE_BUFFER_SIZE)
+
+            report_done()
+            return True
+
+        except Exception as e:
+            with print_lock:
                 print(f"  - Error processing file {filename}: {e}")
+            report_done()
+            return False
+
+    # --- 4. Collect all .txt annotation files in the specified folder ---
+    # os.scandir yields DirEntry objects with the name, full path and cached file type,
+    # so no extra os.path.join or stat call is needed per file
+    with os.scandir(folder_name) as entries:
+        txt_entries = [entry for entry in entries if entry.name.endswith(".txt") and entry.is_file()]
+
+    # The files are independent and the work is I/O-bound, so threads can overlap the reads/writes
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        processed_files_count = sum(executor.map(process_file, txt_entries))
 
     print(f"\nFiltering complete. Processed {processed_files_count} .txt files in '{folder_name}'.")
 
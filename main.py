@@ -1,7 +1,13 @@
 from ultralytics import YOLO
+import argparse
 import cv2
-import matplotlib.pyplot as plt
 import os
+import torch
+
+# --show: prikaži svaki rezultat u prozoru (bez toga se rezultati samo snimaju na disk)
+parser = argparse.ArgumentParser()
+parser.add_argument('--show', action='store_true', help="prikaži rezultate u prozoru")
+args = parser.parse_args()
 
 # Učitaj trenirani model (možeš zamijeniti sa 'last.pt')
 model = YOLO("trenirani modeli/100epoha/best.pt")  # npr. 'runs/detect/train/weights/best.pt'
@@ -11,14 +17,20 @@ folder_path= "TestData/Slike"  # Putanja do mape sa slikama
 slike = [f for f in os.listdir(folder_path) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
 
 
-# Prođi kroz slike i prikaži rezultate
-for img_name in slike:
-    img_path = os.path.join(folder_path, img_name)
-    results = model(img_path, save=True)  # automatski snima u runs/detect/predict/
-    
-    # Opcionalno: prikaži rezultat i u Python prozoru
-    img_with_boxes = results[0].plot()  # dobiješ NumPy sliku sa anotacijama
-    plt.imshow(cv2.cvtColor(img_with_boxes, cv2.COLOR_BGR2RGB))
-    plt.title(f"Rezultat: {img_path}")
-    plt.axis('off')
-    plt.show()
+# Na GPU-u koristi FP16 (half=True), inače CPU
+gpu_args = {'device': 0, 'half': True} if torch.cuda.is_available() else {}
+
+# Sve slike se šalju modelu odjednom, u batch-evima od 16 (stream=True vraća rezultate jedan po jedan)
+paths = [os.path.join(folder_path, n) for n in slike]
+results = model(paths, save=True, batch=16, stream=True, **gpu_args)  # automatski snima u runs/detect/predict/
+
+# Prođi kroz rezultate (ovo pokreće detekciju i snimanje) i po želji ih prikaži
+for img_path, result in zip(paths, results):
+    if args.show:
+        img_with_boxes = result.plot()  # dobiješ NumPy sliku sa anotacijama (BGR, bez konverzije)
+        cv2.imshow("Rezultat", img_with_boxes)
+        print(f"Rezultat: {img_path} (pritisni bilo koju tipku za sljedeću sliku)")
+        cv2.waitKey(0)
+
+if args.show:
+    cv2.destroyAllWindows()
@@ -1,30 +1,43 @@
 import os
 import shutil
-import re
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from _dataset_utils import MAX_WORKERS
 
 # Path to the folder with images and txts
 data_folder = os.path.join("bear", "bear")
 
-# Pattern to match filenames ending with two uppercase letters before extension
-pattern = re.compile(r".*_(\w{2})\.(jpg|jpeg|png|txt)$", re.IGNORECASE)
-
-# Dictionary to group file paths by the two-letter suffix
-grouped_files = defaultdict(list)
-
-# Walk through the data folder
-for filename in os.listdir(data_folder):
-    match = pattern.match(filename)
-    if match:
-        suffix = match.group(1).upper()
-        full_path = os.path.join(data_folder, filename)
-        grouped_files[suffix].append(full_path)
-
-# Create folders and move files
-for suffix, files in grouped_files.items():
-    target_folder = os.path.join(os.getcwd(), suffix)
-    os.makedirs(target_folder, exist_ok=True)
-    for file_path in files:
-        shutil.move(file_path, os.path.join(target_folder, os.path.basename(file_path)))
+# Files named like "<name>_XY.<ext>" with one of these extensions are grouped by "XY"
+extensions = {"jpg", "jpeg", "png", "txt"}
+
+def move_file(src, dst):
+    # Source and target are normally on the same filesystem, where a move is a single
+    # rename syscall; shutil.move is only needed when crossing filesystems.
+    try:
+        os.replace(src, dst)
+    except OSError:
+        shutil.move(src, dst)
+
+# Suffix folders that have already been created
+seen = set()
+futures = []
+
+# Walk through the data folder once, moving every matching file as soon as it is found
+with os.scandir(data_folder) as entries, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    for entry in entries:
+        # Plain string checks instead of a regex: only the two letters before the last '.' matter
+        stem, dot, ext = entry.name.rpartition('.')
+        if (ext.lower() in extensions and len(stem) >= 3 and stem[-3] == '_'
+                and stem[-2:].isalpha() and entry.is_file()):
+            suffix = stem[-2:].upper()
+            target_folder = os.path.join(os.getcwd(), suffix)
+            if suffix not in seen:
+                os.makedirs(target_folder, exist_ok=True)
+                seen.add(suffix)
+            futures.append(executor.submit(move_file, entry.path, os.path.join(target_folder, entry.name)))
+
+# Re-raise any error from the worker threads
+for future in futures:
+    future.result()
 
 print("Files reorganized into folders based on suffix.")
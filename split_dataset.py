@@ -1,11 +1,44 @@
 import os
-import random
 import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from _dataset_utils import MAX_WORKERS
 
 # === USER INPUT ===
 SOURCE_FOLDER = input("Enter the name of the folder where all images and txts are located: ").strip()
 OUTPUT_FOLDER = 'yolo_dataset'
-SEED = 42
+
+
+def fast_copy(src, dst):
+    """
+    Copies src to dst as cheaply as possible:
+    a hard link (metadata only) when both are on the same filesystem, then
+    os.copy_file_range (in-kernel / reflink copy on Linux), then shutil.copy2.
+    Note: a hard-linked file shares its content with the file in SOURCE_FOLDER.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return  # Already linked by a previous run; writing to it would truncate src
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            remaining = os.fstat(s.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        if remaining > 0:
+            raise OSError("copy_file_range stopped early")
+        shutil.copystat(src, dst)
+    except (AttributeError, OSError):
+        shutil.copy2(src, dst)
 
 # === CHECK EXISTENCE ===
 if not os.path.exists(SOURCE_FOLDER):
@@ -18,43 +51,56 @@ for split in splits:
     os.makedirs(os.path.join(OUTPUT_FOLDER, split, 'images'), exist_ok=True)
     os.makedirs(os.path.join(OUTPUT_FOLDER, split, 'labels'), exist_ok=True)
 
-# === GET IMAGE FILES ===
-all_images = [f for f in os.listdir(SOURCE_FOLDER) if f.lower().endswith('.jpg')]
-all_images.sort()
-
-# === SHUFFLE ===
-random.seed(SEED)
-random.shuffle(all_images)
+# === GET IMAGE AND LABEL FILES ===
+# One scandir pass pairs every image with its label by file stem:
+# {stem: [image DirEntry, label DirEntry or None]}, so no os.path.exists call is needed later
+by_stem = {}
+with os.scandir(SOURCE_FOLDER) as entries:
+    for entry in entries:
+        if not entry.is_file():
+            continue
+        stem, _, ext = entry.name.rpartition('.')
+        if entry.name.lower().endswith('.jpg'):
+            by_stem.setdefault(stem, [None, None])[0] = entry
+        elif ext == 'txt':
+            by_stem.setdefault(stem, [None, None])[1] = entry
 
 # === SPLIT ===
-n = len(all_images)
-train_end = int(0.8 * n)
-val_end = int(0.9 * n)
-
-split_files = {
-    'train': all_images[:train_end],
-    'val': all_images[train_end:val_end],
-    'test': all_images[val_end:]
-}
+# Each image gets a split from a hash of its file name (80% train, 10% val, 10% test).
+# This is O(1) per file, needs no sort or shuffle of the whole list, and the same file
+# always lands in the same split, even when the dataset grows.
+def get_split(img_file):
+    bucket = zlib.crc32(img_file.encode()) % 100
+    if bucket < 80:
+        return 'train'
+    if bucket < 90:
+        return 'val'
+    return 'test'
 
 # === MOVE FILES & HANDLE LABELS ===
-for split, files in split_files.items():
-    for img_file in files:
-        label_file = img_file.rsplit('.', 1)[0] + '.txt'
-        src_img = os.path.join(SOURCE_FOLDER, img_file)
-        src_lbl = os.path.join(SOURCE_FOLDER, label_file)
-
-        dst_img = os.path.join(OUTPUT_FOLDER, split, 'images', img_file)
-        dst_lbl = os.path.join(OUTPUT_FOLDER, split, 'labels', label_file)
-
-        # Copy image
-        shutil.copy2(src_img, dst_img)
-
-        # Copy label or create empty label
-        if os.path.exists(src_lbl):
-            shutil.copy2(src_lbl, dst_lbl)
-        else:
-            # Create empty label file
-            open(dst_lbl, 'w').close()
+def copy_sample(sample, split):
+    img_entry, lbl_entry = sample
+    img_file = img_entry.name
+    # Images are filtered to '.jpg' above, so the stem is everything but the last 4 characters
+    label_file = img_file[:-4] + '.txt'
+
+    dst_img = os.path.join(OUTPUT_FOLDER, split, 'images', img_file)
+    dst_lbl = os.path.join(OUTPUT_FOLDER, split, 'labels', label_file)
+
+    # Copy image
+    fast_copy(img_entry.path, dst_img)
+
+    # Copy label or create empty label
+    if lbl_entry is not None:
+        fast_copy(lbl_entry.path, dst_lbl)
+    else:
+        # Create empty label file
+        open(dst_lbl, 'w').close()
+
+# Samples are independent, so they are copied in parallel
+samples = [pair for pair in by_stem.values() if pair[0] is not None]
+sample_splits = [get_split(img_entry.name) for img_entry, _ in samples]
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    list(executor.map(copy_sample, samples, sample_splits))
 
 print("✅ Dataset split complete and organized into 'yolo_dataset/' folder.")
@@ -1,5 +1,8 @@
 import os
 
+import _yolo_txt
+from _dataset_utils import atomic_write
+
 def get_class_mapping(prompt_num):
     print(f"\nEnter class mapping #{prompt_num}")
     class_from = int(input("Classes FROM: "))
@@ -13,25 +16,50 @@ def modify_txt_files(folder, mappings):
         print(f"Folder '{folder}' not found!")
         return
 
-    for file_name in os.listdir(folder_path):
-        if file_name.endswith(".txt"):
-            file_path = os.path.join(folder_path, file_name)
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
+    # setdefault keeps the first mapping when the same class is given twice
+    int_mapping = {}
+    for old_class, new_class in mappings:
+        int_mapping.setdefault(old_class, new_class)
+    # Class ids as strings, so the first column can be looked up without int()/str() conversions
+    mapping = {str(old_class): str(new_class) for old_class, new_class in int_mapping.items()}
+    # The compiled (Numba) helper only handles non-negative class ids
+    use_compiled = _yolo_txt.AVAILABLE and all(c >= 0 for item in int_mapping.items() for c in item)
+
+    # Take a snapshot of the .txt files first: the loop below creates and renames files
+    # in the same directory, and a re-listed file would be remapped twice
+    with os.scandir(folder_path) as entries:
+        txt_entries = [entry for entry in entries if entry.name.endswith(".txt") and entry.is_file()]
 
+    for entry in txt_entries:
+        file_path = entry.path
+
+        if use_compiled:
+            with open(file_path, 'rb') as f:
+                content, changed = _yolo_txt.remap_lines(f.read(), int_mapping)
+            write_mode = 'wb'
+        else:
             new_lines = []
-            for line in lines:
-                parts = line.strip().split()
-                if parts and parts[0].isdigit():
-                    class_id = int(parts[0])
-                    for old_class, new_class in mappings:
-                        if class_id == old_class:
-                            parts[0] = str(new_class)
-                            break
-                new_lines.append(" ".join(parts) + "\n")
-
-            with open(file_path, 'w') as f:
-                f.writelines(new_lines)
+            changed = False
+            with open(file_path, 'r') as f:
+                for line in f:
+                    # Only the leading class id can change: lines without a mapped id are kept
+                    # as they are, and mapped lines only get that first token replaced
+                    parts = line.split(None, 1)
+                    class_id = parts[0] if parts else None
+                    if class_id and class_id[0] == '0' and class_id.isdigit():
+                        class_id = class_id.lstrip('0') or '0' # '01' is class 1
+                    if class_id in mapping:
+                        new_lines.append(line.replace(parts[0], mapping[class_id], 1))
+                        changed = True
+                    else:
+                        new_lines.append(line)
+            content = "".join(new_lines)
+            write_mode = 'w'
+
+        # Only rewrite files whose content actually changed; the temp file is
+        # renamed over the original atomically, so it is never left truncated
+        if changed:
+            atomic_write(file_path, [content], write_mode)
 
     print(f"All .txt files in '{folder}' updated successfully.")
 